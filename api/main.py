@@ -2,15 +2,12 @@
 
 import os
 import sys
-import pandas as pd
 from dotenv import load_dotenv
-import io
-import uuid
 import logging
 import asyncio
 from typing import List
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
@@ -20,12 +17,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # --- UPDATED IMPORTS for the new architecture ---
 from app.llm.openrouter_parser import OpenRouterParser
 from app.core.command_pipeline import CommandPipeline
+from app.core.session_store import SessionStore
 from app.models.result import Result
 
 # --- Logging Setup (remains the same) ---
 class ConnectionManager:
-    def __init__(self): self.active_connections: List[WebSocket] = []
-    async def connect(self, ws: WebSocket): await ws.accept(); self.active_connections.append(ws)
+    def __init__(self): self.active_connections: List[WebSocket] = []; self.loop = None
+    async def connect(self, ws: WebSocket):
+        self.loop = asyncio.get_running_loop(); await ws.accept(); self.active_connections.append(ws)
     def disconnect(self, ws: WebSocket): self.active_connections.remove(ws)
     async def broadcast(self, msg: str):
         for conn in self.active_connections: await conn.send_text(msg)
@@ -33,7 +32,14 @@ manager = ConnectionManager()
 
 class WebSocketLogHandler(logging.Handler):
     def __init__(self, manager: ConnectionManager): super().__init__(); self.manager = manager
-    def emit(self, record): asyncio.create_task(self.manager.broadcast(self.format(record)))
+    def emit(self, record):
+        message = self.format(record)
+        try:
+            asyncio.get_running_loop().create_task(self.manager.broadcast(message))
+        except RuntimeError:
+            # Logged from a threadpool worker (e.g. a refine task): hand off to the server's loop
+            if self.manager.loop is not None and self.manager.active_connections:
+                asyncio.run_coroutine_threadsafe(self.manager.broadcast(message), self.manager.loop)
 
 root_logger = logging.getLogger()
 root_logger.setLevel(logging.INFO)
@@ -56,29 +62,35 @@ pipeline = CommandPipeline(llm_parser=llm_parser) # No more data_processor!
 
 app = FastAPI(title="Voice Data Assistant API", version="2.0.0") # Version bump for major refactor
 app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
-dataframes_cache = {}
+# Session data lives in a directory shared by all workers (see PANDA_SESSION_DIR)
+session_store = SessionStore()
 
 class CommandRequest(BaseModel):
     session_id: str
     command: str
+    approximate: bool = False # Answer from the session's sample, with confidence intervals
+    refine: bool = False # With approximate, also compute the exact answer in the background
 
-def create_session(df: pd.DataFrame) -> dict:
-    session_id = str(uuid.uuid4())
-    dataframes_cache[session_id] = df
+def session_response(session_id: str) -> dict:
+    dataset = session_store.get(session_id)
+    preview = dataset.head()
+    # NaN isn't valid JSON; send missing values as null
+    preview = preview.astype(object).where(preview.notna(), None)
     return {
-        "session_id": session_id, "columns": df.columns.tolist(),
-        "shape": df.shape, "preview": df.head().to_dict(orient='records')
+        "session_id": session_id, "columns": dataset.columns,
+        "shape": dataset.shape, "preview": preview.to_dict(orient='records')
     }
 
 # --- API Endpoints (no changes to their logic) ---
+# Ingestion hashes, parses and samples the file, so these run in the threadpool (plain def), off the event loop
 @app.post("/upload_csv")
-async def upload_csv(file: UploadFile = File(...)):
-    if not file.filename.endswith('.csv'):
+def upload_csv(file: UploadFile = File(...)):
+    # Accepts CSV as well as columnar formats (Parquet/Feather/Arrow), which are read lazily per command
+    if not session_store.is_supported(file.filename):
         raise HTTPException(status_code=400, detail="Invalid file type.")
     try:
-        content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-        session_data = create_session(df)
+        # Starlette has already spooled the upload; hash it in chunks and only parse unseen content
+        session_data = session_response(session_store.create_session_from_file(file.file, file.filename))
         logging.info(f"Uploaded '{file.filename}'. Session: {session_data['session_id']}")
         return session_data
     except Exception as e:
@@ -86,12 +98,13 @@ async def upload_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/sample_data")
-async def load_sample_data():
+def load_sample_data():
     try:
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         sample_file_path = os.path.join(project_root, 'data', 'coffee.csv')
-        df = pd.read_csv(sample_file_path)
-        session_data = create_session(df)
+        with open(sample_file_path, 'rb') as sample_file:
+            session_id = session_store.create_session_from_file(sample_file, sample_file_path)
+        session_data = session_response(session_id)
         logging.info(f"Loaded sample data. Session: {session_data['session_id']}")
         return session_data
     except FileNotFoundError:
@@ -101,25 +114,48 @@ async def load_sample_data():
         logging.error(f"Error loading sample data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def refine_result(result_id: str, command_module, validated_params, dataset):
+    # Always store something, or /results/{result_id} would report "pending" forever
+    try:
+        result = pipeline.execute(command_module, validated_params, dataset)
+        payload = result.model_dump_json()
+    except Exception as e:
+        logging.error(f"Error refining result {result_id}: {e}")
+        payload = Result(result_type='error', message=str(e)).model_dump_json()
+    session_store.save_result(result_id, payload)
+    logging.info(f"Exact result {result_id} is ready.")
+
 @app.post("/analyze", response_model=Result)
-async def analyze_command(request: CommandRequest):
+async def analyze_command(request: CommandRequest, background_tasks: BackgroundTasks):
     session_id = request.session_id
     command = request.command
     
-    if session_id not in dataframes_cache:
+    dataset = session_store.get(session_id)
+    if dataset is None:
         raise HTTPException(status_code=404, detail="Session ID not found.")
     
-    df = dataframes_cache[session_id]
-    
     try:
-        result = pipeline.run(command, df) # This call remains the same
+        command_module, validated_params = pipeline.parse(command)
+        result = pipeline.execute(command_module, validated_params, dataset, approximate=request.approximate)
         if result.result_type == 'error': 
             raise HTTPException(status_code=400, detail=result.message)
+        if result.approximate and request.refine:
+            result.refine_id = session_store.create_result(session_id)
+            background_tasks.add_task(refine_result, result.refine_id, command_module, validated_params, dataset)
         return result
     except Exception as e:
         logging.error(f"Internal Server Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/results/{result_id}")
+async def get_result(result_id: str):
+    stored = session_store.get_result(result_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Result ID not found.")
+    if stored["payload"] is None:
+        return {"status": "pending", "result": None}
+    return {"status": "done", "result": Result.model_validate_json(stored["payload"])}
+
 @app.websocket("/ws/logs")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
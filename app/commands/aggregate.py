@@ -3,6 +3,9 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.commands.base import CommandInterface, CommandParams
 from app.models.result import Result
+from app.core.sampling import estimate, estimate_grouped
+
+APPROXIMATE_AGG_FUNCS = ['sum', 'mean', 'count']
 
 class AggregateCommandParams(CommandParams): # Inherits from CommandParams to get 'filters'
     agg_func: str = Field(..., description="The aggregation function to use (e.g., 'sum', 'mean', 'count').")
@@ -17,6 +20,42 @@ class AggregateCommand(CommandInterface):
     trigger_words = ["total", "sum", "average", "mean", "count", "top", "lowest", "highest", "bottom"]
     pydantic_model = AggregateCommandParams
 
+    def required_columns(self, params: AggregateCommandParams, df_columns: List[str]) -> List[str]:
+        return self._referenced_columns(params, df_columns, params.target_column, *(params.group_by or []))
+
+    def pushdown_filters(self, params: AggregateCommandParams, df_columns: List[str]) -> dict:
+        return self._resolve_filters(params.filters, df_columns)
+
+    def supports_approximate(self, params: AggregateCommandParams) -> bool:
+        return params.agg_func in APPROXIMATE_AGG_FUNCS
+
+    def execute_approximate(self, params: AggregateCommandParams, sample: pd.DataFrame) -> Optional[Result]:
+        if not self.supports_approximate(params):
+            return None
+
+        mask = self._filter_mask(sample, params.filters)
+        target_column = self._resolve_column(params.target_column, sample.columns) if params.target_column else None
+        group_by_columns = [self._resolve_column(col, sample.columns) for col in params.group_by] if params.group_by else []
+
+        if not target_column and params.agg_func not in ['count']:
+            raise ValueError(f"A target column is required for the '{params.agg_func}' operation.")
+
+        if group_by_columns:
+            result_df = estimate_grouped(sample, target_column, group_by_columns, params.agg_func, mask)
+            ascending = params.sort_order == 'asc'
+            result_df = result_df.sort_values(by='result', ascending=ascending)
+
+            if params.limit:
+                result_df = result_df.head(params.limit)
+
+            return Result(result_type='table', data=result_df.to_dict(orient='records'), message="Approximate aggregation successful.",
+                          approximate=True, confidence_level=0.95)
+
+        values = sample[target_column].astype(float) if target_column else None
+        result_val, ci_low, ci_high = estimate(sample, values, mask, params.agg_func)
+        return Result(result_type='value', data=result_val, message="Approximate aggregation successful.",
+                      approximate=True, confidence_level=0.95, confidence_interval=[ci_low, ci_high])
+
     def execute(self, params: AggregateCommandParams, df: pd.DataFrame) -> Result:
         # Step 1: Apply filters using the helper from the base class
         df_filtered = self._apply_filters(df, params.filters)
@@ -45,4 +84,7 @@ class AggregateCommand(CommandInterface):
         
         else:
             result_val = df_filtered[target_column].agg(params.agg_func)
+            # numpy scalars (e.g. the int64 sum of an integer column) aren't JSON serializable
+            if hasattr(result_val, 'item'):
+                result_val = result_val.item()
             return Result(result_type='value', data=result_val, message="Aggregation successful.")
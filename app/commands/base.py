@@ -40,6 +40,37 @@ class CommandInterface(ABC):
         """The method to execute the command's logic."""
         pass
 
+    def supports_approximate(self, params: BaseModel) -> bool:
+        """Whether execute_approximate can answer these params; checked before the sample is read."""
+        return False
+
+    def execute_approximate(self, params: BaseModel, sample: pd.DataFrame) -> Optional[Result]:
+        """
+        Estimates the result from a stratified session sample (see app/core/sampling.py).
+        Returns None if this command can't be approximated, so the pipeline runs it exactly.
+        """
+        return None
+
+    def _filter_mask(self, df: pd.DataFrame, filters: Optional[Dict[str, Any]]) -> pd.Series:
+        """Boolean mask of the rows _apply_filters would keep, for estimators that need every sampled row."""
+        return pd.Series(df.index.isin(self._apply_filters(df, filters).index), index=df.index)
+
+    def required_columns(self, params: BaseModel, df_columns: List[str]) -> Optional[List[str]]:
+        """The columns this command reads for the given params, or None if it needs all of them."""
+        return None
+
+    def pushdown_filters(self, params: BaseModel, df_columns: List[str]) -> Dict[str, Any]:
+        """Filters (with resolved column names) that can be applied while the data is being read."""
+        return {}
+
+    def _referenced_columns(self, params: CommandParams, df_columns: List[str], *names: Optional[str]) -> List[str]:
+        """Resolves the given column names plus any filter columns, skipping empty ones."""
+        names = [name for name in names if name] + list((params.filters or {}).keys())
+        return list(dict.fromkeys(self._resolve_column(name, df_columns) for name in names))
+
+    def _resolve_filters(self, filters: Optional[Dict[str, Any]], df_columns: List[str]) -> Dict[str, Any]:
+        return {self._resolve_column(column, df_columns): value for column, value in (filters or {}).items()}
+
     def _resolve_column(self, name: str, df_columns: List[str]) -> str:
         """Finds the actual column name that best matches the target name."""
         def normalize(s: str) -> str:
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.commands.base import CommandInterface, CommandParams
 from app.models.result import Result
+from app.core.sampling import estimate_grouped
 
 class PlotCommandParams(CommandParams): # Inherits from CommandParams
     plot_type: str = Field(..., description="The type of chart to generate (e.g., 'bar', 'line').")
@@ -15,6 +16,45 @@ class PlotCommand(CommandInterface):
     trigger_words = ["plot", "chart", "graph", "draw", "visualize"]
     pydantic_model = PlotCommandParams
 
+    def required_columns(self, params: PlotCommandParams, df_columns: List[str]) -> List[str]:
+        return self._referenced_columns(params, df_columns, params.target_column, *params.group_by)
+
+    def pushdown_filters(self, params: PlotCommandParams, df_columns: List[str]) -> dict:
+        return self._resolve_filters(params.filters, df_columns)
+
+    def supports_approximate(self, params: PlotCommandParams) -> bool:
+        return True
+
+    def execute_approximate(self, params: PlotCommandParams, sample: pd.DataFrame) -> Optional[Result]:
+        mask = self._filter_mask(sample, params.filters)
+        target_column = self._resolve_column(params.target_column, sample.columns)
+        group_by_columns = [self._resolve_column(col, sample.columns) for col in params.group_by]
+
+        agg_func = 'sum'
+        plot_df = estimate_grouped(sample, target_column, group_by_columns, agg_func, mask)
+
+        labels_col = group_by_columns[0]
+
+        chart_data = {
+            "labels": plot_df[labels_col].tolist(),
+            "datasets": [{
+                "label": f"Approx. {agg_func} of {target_column} by {labels_col}",
+                "data": plot_df['result'].tolist(),
+                "backgroundColor": 'rgba(76, 175, 80, 0.5)',
+                "borderColor": 'rgba(76, 175, 80, 1)',
+                "borderWidth": 1,
+            }]
+        }
+
+        return Result(
+            result_type='plot',
+            message="Approximate plot data generated successfully.",
+            plot_data={"type": params.plot_type, "data": chart_data,
+                       "confidence_intervals": plot_df[['ci_low', 'ci_high']].values.tolist()},
+            approximate=True,
+            confidence_level=0.95,
+        )
+
     def execute(self, params: PlotCommandParams, df: pd.DataFrame) -> Result:
         # Step 1: Apply filters using the helper from the base class
         df_filtered = self._apply_filters(df, params.filters)
@@ -1,12 +1,20 @@
 import logging
 import pandas as pd
+from typing import Union
 from app.core.command_registry import command_registry
+from app.core.dataset import Dataset
+from app.core.sampling import SAMPLE_COLUMNS
 
 class CommandPipeline:
     def __init__(self, llm_parser):
         self.llm_parser = llm_parser
 
-    def run(self, command: str, df: pd.DataFrame):
+    def run(self, command: str, data: Union[pd.DataFrame, Dataset], approximate: bool = False):
+        command_module, validated_params = self.parse(command)
+        return self.execute(command_module, validated_params, data, approximate=approximate)
+
+    def parse(self, command: str):
+        """Turns a natural language command into (command_module, validated_params)."""
         logging.info(f"-> [Pipeline] Processing command: '{command}'")
         
         # Step 1: Parse the command to get the command name and parameters
@@ -24,9 +32,36 @@ class CommandPipeline:
 
         # Step 3: Validate the parameters against the command's specific model
         validated_params = command_module.pydantic_model(**parameters)
-        logging.info(f"-> [Pipeline] Executing command '{command_name}' with validated params.")
+        return command_module, validated_params
+
+    def execute(self, command_module, validated_params, data: Union[pd.DataFrame, Dataset], approximate: bool = False):
+        """Runs already parsed params, so a result can be recomputed (e.g. refined) without asking the LLM again."""
+        logging.info(f"-> [Pipeline] Executing command '{command_module.name}' with validated params.")
+
+        # Step 4a: In approximate mode, answer from the session's stratified sample if the command supports it
+        if approximate and isinstance(data, Dataset) and data.sample is not None:
+            # Checked first, so commands that can't be approximated never read the sample
+            result = None
+            if command_module.supports_approximate(validated_params):
+                columns = command_module.required_columns(validated_params, data.columns)
+                # No filter pushdown here: the estimators need every sampled row, not just the matching ones
+                sample = data.sample.load(columns=None if columns is None else columns + SAMPLE_COLUMNS)
+                result = command_module.execute_approximate(validated_params, sample)
+            if result is not None:
+                logging.info(f"-> [Pipeline] Estimated from a {len(sample)}-row sample. Result type: {result.result_type}")
+                return result
+            logging.info(f"-> [Pipeline] '{command_module.name}' can't be approximated, running it exactly.")
+
+        # Step 4b: For lazy datasets, read only the columns (and rows) this command needs
+        if isinstance(data, Dataset):
+            columns = command_module.required_columns(validated_params, data.columns)
+            filters = command_module.pushdown_filters(validated_params, data.columns)
+            logging.info(f"-> [Pipeline] Loading columns: {columns if columns is not None else 'all'}")
+            df = data.load(columns=columns, filters=filters)
+        else:
+            df = data
 
-        # Step 4: Execute the command
+        # Step 5: Execute the command
         result = command_module.execute(validated_params, df)
         logging.info(f"-> [Pipeline] Processor executed. Result type: {result.result_type}")
         return result
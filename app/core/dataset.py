@@ -0,0 +1,123 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import LocalFileSystem
+from typing import Any, Dict, List, Optional
+
+# Maps accepted upload extensions to the on-disk format a session is served from.
+# CSV has no columnar layout, so it is parsed once and stored as Arrow IPC.
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'ipc',
+    '.arrow': 'ipc',
+    '.ipc': 'ipc',
+}
+
+class Dataset:
+    """
+    A lazy handle to a session's data on disk (Parquet or Arrow IPC).
+
+    Only the schema is read up front. Commands load just the columns they
+    reference, and simple filters are pushed down into the scan so rows that
+    don't match are never materialized as pandas objects.
+    """
+
+    # Memory-mapping lets Arrow IPC columns be used zero-copy and shared between workers.
+    _filesystem = LocalFileSystem(use_mmap=True)
+
+    def __init__(self, path: str, format: str, sample: Optional['Dataset'] = None):
+        self.path = path
+        self.format = format
+        # A small stratified sample built at ingestion, used for approximate answers
+        self.sample = sample
+        self._dataset = ds.dataset(path, format=format, filesystem=self._filesystem)
+        # Session files never change once stored, so the row count only has to be read once
+        self._num_rows = None
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self._dataset.schema
+
+    @property
+    def columns(self) -> List[str]:
+        return self._dataset.schema.names
+
+    @property
+    def num_rows(self) -> int:
+        if self._num_rows is None:
+            self._num_rows = self._dataset.count_rows()
+        return self._num_rows
+
+    @property
+    def shape(self) -> tuple:
+        return (self.num_rows, len(self.columns))
+
+    def _filter_expression(self, filters: Optional[Dict[str, Any]]) -> Optional[ds.Expression]:
+        """
+        Builds a scan predicate matching CommandInterface._apply_filters (case-insensitive equality).
+        Only string columns are pushed down; other types keep pandas' str() semantics and are
+        filtered by the command after loading.
+        """
+        expression = None
+        for column, value in (filters or {}).items():
+            field_type = self._dataset.schema.field(column).type
+            if not (pa.types.is_string(field_type) or pa.types.is_large_string(field_type)):
+                continue
+            condition = pc.equal(pc.utf8_lower(ds.field(column)), str(value).lower())
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def load(self, columns: Optional[List[str]] = None, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Reads the given columns (all if None), keeping only rows matching the pushed-down filters."""
+        if columns is not None:
+            # Keep the file's column order regardless of the order commands ask in.
+            wanted = set(columns)
+            columns = [col for col in self.columns if col in wanted]
+        table = self._dataset.to_table(columns=columns, filter=self._filter_expression(filters))
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def take(self, positions) -> pa.Table:
+        """Reads only the rows at the given positions (all columns), keeping the Arrow types."""
+        return self._dataset.take(pa.array(positions, type=pa.int64()))
+
+    def page(self, page: int, page_size: int = 20) -> pd.DataFrame:
+        """
+        Reads one page of rows (0-based page number), so UIs never hold the whole table.
+        Only the Parquet row groups (or Arrow record batches) up to the page are touched.
+        """
+        start = max(page, 0) * page_size
+        stop = min(start + page_size, self.num_rows)
+        if start >= stop:
+            return self.head(0)
+        if self.format == 'parquet':
+            table = self._parquet_slice(start, stop)
+        else:
+            batches, offset = [], 0
+            for batch in self._dataset.to_batches():
+                if offset + batch.num_rows > start:
+                    batches.append(batch.slice(max(start - offset, 0), stop - max(start, offset)))
+                offset += batch.num_rows
+                if offset >= stop:
+                    break
+            table = pa.Table.from_batches(batches, schema=self.schema)
+        return table.to_pandas()
+
+    def _parquet_slice(self, start: int, stop: int) -> pa.Table:
+        """Reads rows [start, stop) from just the row groups that hold them, using the file's metadata."""
+        parquet_file = pq.ParquetFile(self.path, memory_map=True)
+        row_groups, first_row, offset = [], None, 0
+        for index in range(parquet_file.num_row_groups):
+            group_rows = parquet_file.metadata.row_group(index).num_rows
+            if offset + group_rows > start and offset < stop:
+                row_groups.append(index)
+                first_row = offset if first_row is None else first_row
+            offset += group_rows
+        table = parquet_file.read_row_groups(row_groups)
+        return table.slice(start - first_row, stop - start)
+
+    def head(self, n: int = 5, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return self._dataset.head(n, columns=columns).to_pandas()
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import List, Optional
+
+# Bookkeeping columns stored alongside the sampled rows.
+STRATUM_COLUMN = "__stratum"
+STRATUM_SIZE_COLUMN = "__stratum_size"
+SAMPLE_COLUMNS = [STRATUM_COLUMN, STRATUM_SIZE_COLUMN]
+
+# Normal quantiles for the confidence levels we report.
+Z_SCORES = {0.90: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+def choose_stratum_column(dataset, max_strata: int = 50, probe_rows: int = 10_000) -> Optional[str]:
+    """
+    Picks the text column with the fewest distinct values (2..max_strata) in the first
+    probe_rows rows, if any. Only that slice of the text columns is read.
+    """
+    candidates = [field.name for field in dataset.schema
+                  if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)]
+    if not candidates:
+        return None
+    distinct = dataset.head(probe_rows, columns=candidates).nunique()
+    distinct = distinct[(distinct >= 2) & (distinct <= max_strata)]
+    return distinct.idxmin() if not distinct.empty else None
+
+def build_stratified_sample(dataset, max_rows: int = 10_000, max_strata: int = 50, seed: int = 0) -> pa.Table:
+    """
+    Draws a stratified random sample from a Dataset, reading a slice of the text
+    columns to pick the strata, then the stratum column and only the sampled rows.
+
+    Rows are allocated to strata proportionally (at least 2 per stratum so the
+    within-stratum variance can be estimated). Datasets no larger than max_rows
+    are "sampled" in full, which makes every estimate exact. The sample stays an
+    Arrow table, so its columns keep the dataset's types.
+    """
+    num_rows = dataset.num_rows
+    stratum_column = choose_stratum_column(dataset, max_strata)
+    labels = None
+    if stratum_column:
+        labels = dataset.load([stratum_column])[stratum_column].astype(str).to_numpy()
+        if len(pd.unique(labels)) > max_strata:
+            # The probed slice wasn't representative; too many strata would bloat the sample
+            labels = None
+    if labels is None:
+        labels = np.full(num_rows, "all", dtype=object)
+
+    rng = np.random.default_rng(seed)
+    strata = pd.Series(np.arange(num_rows)).groupby(labels)
+    fraction = min(1.0, max_rows / max(num_rows, 1))
+    positions, stratum_labels, stratum_sizes = [], [], []
+    for label, rows in strata:
+        size = len(rows)
+        take = size if fraction >= 1.0 else min(size, max(2, int(round(size * fraction))))
+        chosen = rng.choice(rows.to_numpy(), size=take, replace=False)
+        positions.append(chosen)
+        stratum_labels += [label] * take
+        stratum_sizes += [size] * take
+
+    positions = np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+    order = np.argsort(positions)
+    sample = dataset.take(positions[order])
+    sample = sample.append_column(STRATUM_COLUMN, pa.array(np.asarray(stratum_labels, dtype=object)[order], type=pa.string()))
+    return sample.append_column(STRATUM_SIZE_COLUMN, pa.array(np.asarray(stratum_sizes, dtype=np.int64)[order]))
+
+def _stratified_totals(sums: pd.DataFrame, strata: pd.DataFrame, s1: str, s2: str, levels: List[int]) -> pd.DataFrame:
+    """
+    Combines per-(group, stratum) sums of a variable z (s1 = sum z, s2 = sum z^2 over the
+    domain rows; z is 0 elsewhere) into a stratified total and its variance per group.
+    """
+    stratum = sums.index.get_level_values(-1)
+    N = strata["N"].reindex(stratum).to_numpy(dtype=float)
+    n = strata["n"].reindex(stratum).to_numpy(dtype=float)
+    mean = sums[s1].to_numpy() / n
+    var = np.where(n > 1, (sums[s2].to_numpy() - n * mean ** 2) / np.maximum(n - 1, 1), 0.0).clip(min=0.0)
+    parts = pd.DataFrame({"total": N * mean, "variance": N ** 2 * (1 - n / N) * var / n}, index=sums.index)
+    return parts.groupby(level=levels).sum()
+
+def _grouped_estimates(sample: pd.DataFrame, values: Optional[pd.Series], domain: pd.Series, group_by: List[str],
+                       agg_func: str, confidence: float) -> pd.DataFrame:
+    """
+    Domain estimates for every group at once: one groupby over (group..., stratum) collects
+    count, sum and sum of squares, which is all the stratified estimators need.
+    """
+    z = Z_SCORES[confidence]
+    if agg_func not in ('sum', 'mean', 'count'):
+        raise ValueError(f"Approximate mode does not support '{agg_func}'.")
+    domain = domain.astype(bool)
+    if values is not None:
+        domain = domain & values.notna()
+
+    strata = sample.groupby(STRATUM_COLUMN)[STRATUM_SIZE_COLUMN].agg(N="first", n="size")
+    rows = sample[domain]
+    y = values[domain].astype(float) if values is not None else pd.Series(0.0, index=rows.index)
+    keys = [rows[col] for col in group_by] if group_by else [pd.Series("all", index=rows.index, name="__all")]
+    sums = pd.DataFrame({"cnt": 1.0, "y": y, "yy": y * y}, index=rows.index).groupby(keys + [rows[STRATUM_COLUMN]]).sum()
+    levels = list(range(len(keys)))
+
+    if agg_func == 'count':
+        # The domain indicator is 0/1, so its sum of squares equals its sum
+        estimates = _stratified_totals(sums, strata, "cnt", "cnt", levels)
+    elif agg_func == 'sum':
+        estimates = _stratified_totals(sums, strata, "y", "yy", levels)
+    else:
+        numerator = _stratified_totals(sums, strata, "y", "yy", levels)["total"]
+        denominator = _stratified_totals(sums, strata, "cnt", "cnt", levels)["total"]
+        ratio = numerator / denominator
+        # Linearized variance of the ratio estimator, via the residuals e = y - R (in the domain)
+        r = ratio.reindex(sums.index.droplevel(-1)).to_numpy()
+        residuals = pd.DataFrame({
+            "e": sums["y"].to_numpy() - r * sums["cnt"].to_numpy(),
+            "ee": sums["yy"].to_numpy() - 2 * r * sums["y"].to_numpy() + r ** 2 * sums["cnt"].to_numpy(),
+        }, index=sums.index)
+        variance = _stratified_totals(residuals, strata, "e", "ee", levels)["variance"] / denominator ** 2
+        estimates = pd.DataFrame({"total": ratio, "variance": variance})
+
+    half_width = z * np.sqrt(estimates["variance"])
+    return pd.DataFrame({
+        "result": estimates["total"],
+        "ci_low": estimates["total"] - half_width,
+        "ci_high": estimates["total"] + half_width,
+    })
+
+def estimate(sample: pd.DataFrame, values: Optional[pd.Series], domain: pd.Series, agg_func: str, confidence: float = 0.95):
+    """
+    Estimates sum, mean or count over the rows in `domain` (a boolean mask over the
+    sample, e.g. the filters). Returns (estimate, ci_low, ci_high).
+    """
+    estimates = _grouped_estimates(sample, values, domain, [], agg_func, confidence)
+    if estimates.empty:
+        # Nothing in the sample matched: the total is 0 and the mean is undefined
+        value = float('nan') if agg_func == 'mean' else 0.0
+        return value, value, value
+    row = estimates.iloc[0]
+    return float(row["result"]), float(row["ci_low"]), float(row["ci_high"])
+
+def estimate_grouped(sample: pd.DataFrame, target_column: Optional[str], group_by: List[str], agg_func: str,
+                     mask: pd.Series, confidence: float = 0.95) -> pd.DataFrame:
+    """Estimates every group seen in the (filtered) sample. Returns group columns + result, ci_low, ci_high."""
+    # Grouped counts count rows (like DataFrame.groupby().size()), not non-null values
+    values = sample[target_column].astype(float) if target_column and agg_func != 'count' else None
+    estimates = _grouped_estimates(sample, values, mask, group_by, agg_func, confidence)
+    return estimates.reset_index().rename_axis(None, axis=1)[list(group_by) + ['result', 'ci_low', 'ci_high']]
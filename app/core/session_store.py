@@ -0,0 +1,328 @@
+import os
+import json
+import uuid
+import hashlib
+import sqlite3
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import BinaryIO, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from app.core.dataset import Dataset, FILE_FORMATS
+from app.core.sampling import build_stratified_sample
+
+class SessionStore:
+    """
+    Keeps session data outside of any single worker process.
+
+    Datasets are stored once, named by the SHA-256 of the uploaded bytes: CSVs
+    are parsed into Arrow IPC files, while Parquet/Feather/Arrow uploads are kept
+    as-is so they can be read column by column. A small SQLite index maps session
+    IDs to those datasets. Any uvicorn worker pointed at the same directory can
+    serve any session, and sessions created from the same file share one copy
+    of the data instead of each holding their own. Each dataset also gets a small
+    stratified sample at ingestion, used to answer approximate queries.
+
+    The store is bounded: beyond max_sessions, the least recently used sessions are dropped
+    (and their datasets, once nothing else references them).
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    # Bump this and add a step to _migrate() whenever the index tables change.
+    SCHEMA_VERSION = 1
+
+    def __init__(self, base_dir: Optional[str] = None, max_sessions: Optional[int] = None, max_cached_datasets: int = 32):
+        self.base_dir = base_dir or os.getenv("PANDA_SESSION_DIR") or os.path.join(tempfile.gettempdir(), "panda_sessions")
+        self.max_sessions = max_sessions or int(os.getenv("PANDA_MAX_SESSIONS", "200"))
+        self.data_dir = os.path.join(self.base_dir, "data")
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.index_path = os.path.join(self.base_dir, "index.sqlite3")
+        # Per-process cache of open dataset handles, so sessions of the same file share one.
+        self.max_cached_datasets = max_cached_datasets
+        self._datasets = OrderedDict()
+        # Gradio handlers and Starlette's threadpool call get() concurrently
+        self._datasets_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        # Migrate under the write lock so workers starting together don't race each other
+        with self._transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.SCHEMA_VERSION:
+                raise RuntimeError(f"Session index {self.index_path} has schema v{version}, newer than this code (v{self.SCHEMA_VERSION}).")
+            if version < self.SCHEMA_VERSION:
+                self._migrate(conn, version)
+
+    def _migrate(self, conn: sqlite3.Connection, version: int):
+        """Brings the index from `version` up to SCHEMA_VERSION. Add a step here for every schema change."""
+        if version < 1:
+            legacy = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('sessions', 'datasets', 'results')"
+            ).fetchall()
+            if legacy:
+                # Indexes from before the schema was versioned have no reliable layout. Sessions are
+                # disposable, so start over rather than guess.
+                logging.warning(f"-> [SessionStore] Resetting unversioned session index at {self.index_path}.")
+                for (table,) in legacy:
+                    conn.execute(f"DROP TABLE {table}")
+                for name in os.listdir(self.data_dir):
+                    if not name.endswith(".tmp"):
+                        self._remove_files(os.path.join(self.data_dir, name))
+            conn.execute(
+                """CREATE TABLE datasets (
+                    digest TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    sample_path TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE sessions (
+                    session_id TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL REFERENCES datasets(digest),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            # Results computed in the background (e.g. exact refinements), readable from any worker
+            conn.execute(
+                """CREATE TABLE results (
+                    result_id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    payload TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )"""
+            )
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A fresh connection per call keeps this safe across threads and forked workers.
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _write_arrow(self, table: pa.Table, path: str):
+        # Write to a temp file and rename so other workers never map a half-written file.
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _transaction(self):
+        """A write transaction that takes SQLite's write lock up front (BEGIN IMMEDIATE)."""
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _remove_files(*paths: Optional[str]):
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _insert_session(conn: sqlite3.Connection, digest: str) -> Optional[str]:
+        """Inserts a session only if its dataset still exists (call inside _transaction)."""
+        session_id = str(uuid.uuid4())
+        inserted = conn.execute(
+            "INSERT INTO sessions (session_id, digest, last_used) SELECT ?, digest, ? FROM datasets WHERE digest = ?",
+            (session_id, time.time(), digest),
+        ).rowcount
+        return session_id if inserted else None
+
+    def _register(self, digest: str, path: str, format: str) -> str:
+        """
+        Builds the dataset's sample, then records the dataset and a first session for it
+        in one transaction. Returns the session ID.
+        """
+        sample_path = f"{os.path.splitext(path)[0]}.sample.arrow"
+        try:
+            self._write_arrow(build_stratified_sample(Dataset(path, format)), sample_path)
+            with self._transaction() as conn:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO datasets (digest, path, format, sample_path) VALUES (?, ?, ?, ?)",
+                    (digest, path, format, sample_path),
+                ).rowcount
+                session_id = self._insert_session(conn, digest)
+        except Exception:
+            self._remove_files(path, sample_path)
+            raise
+        if inserted:
+            logging.info(f"-> [SessionStore] Stored {format} dataset {digest[:12]} with sample.")
+        else:
+            # Another worker stored the same content first; the session points at its copy.
+            self._remove_files(path, sample_path)
+        return session_id
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        return os.path.splitext(filename)[1].lower() in FILE_FORMATS
+
+    def create_session_from_file(self, stream: BinaryIO, filename: str) -> str:
+        """
+        Copies a file into the store, hashing it as it streams in, and returns a new session ID.
+        Nothing is parsed if a dataset with the same content exists already; columnar files are
+        never parsed at all, only their schema is read when a session uses them.
+        """
+        format = FILE_FORMATS[os.path.splitext(filename)[1].lower()]
+        hasher = hashlib.sha256()
+        tmp_path = os.path.join(self.data_dir, f"{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as sink:
+                for chunk in iter(lambda: stream.read(self.CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    sink.write(chunk)
+            digest = hasher.hexdigest()
+
+            # Checking for the dataset and referencing it happen in one transaction, so a
+            # concurrent _collect() can't delete it in between.
+            with self._transaction() as conn:
+                session_id = self._insert_session(conn, digest)
+            if session_id:
+                logging.info(f"-> [SessionStore] Dataset {digest[:12]} already stored, skipping parse.")
+            else:
+                # Unique file names, so a concurrent _collect() of the same digest can't remove our files.
+                base_path = os.path.join(self.data_dir, f"{digest}.{uuid.uuid4().hex[:8]}")
+                if format == 'csv':
+                    path, format = f"{base_path}.arrow", 'ipc'
+                    self._write_arrow(pa.Table.from_pandas(pd.read_csv(tmp_path), preserve_index=False), path)
+                elif format == 'ipc' and not self._is_ipc_file(tmp_path):
+                    # Arrow IPC *stream* uploads can't be scanned lazily, so rewrite them once in file format.
+                    path = f"{base_path}.arrow"
+                    try:
+                        with pa.OSFile(tmp_path, "rb") as source:
+                            table = ipc.open_stream(source).read_all()
+                    except (pa.ArrowException, OSError) as e:
+                        raise ValueError(f"Could not read '{os.path.basename(filename)}' as {format}: {e}")
+                    self._write_arrow(table, path)
+                else:
+                    # Open it while it is still a temp file, so a corrupt upload is never stored
+                    try:
+                        Dataset(tmp_path, format).num_rows
+                    except (pa.ArrowException, OSError) as e:
+                        raise ValueError(f"Could not read '{os.path.basename(filename)}' as {format}: {e}")
+                    path = f"{base_path}.{'arrow' if format == 'ipc' else format}"
+                    os.replace(tmp_path, path)
+                session_id = self._register(digest, path, format)
+        finally:
+            self._remove_files(tmp_path)
+
+        logging.info(f"-> [SessionStore] Created session {session_id} for dataset {digest[:12]}.")
+        self._evict()
+        return session_id
+
+    @staticmethod
+    def _is_ipc_file(path: str) -> bool:
+        try:
+            with pa.memory_map(path, "r") as source:
+                ipc.open_file(source)
+            return True
+        except pa.ArrowInvalid:
+            return False
+
+    def _evict(self):
+        with self._connect() as conn:
+            expired = conn.execute(
+                "SELECT session_id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                (self.max_sessions,),
+            ).fetchall()
+        for (session_id,) in expired:
+            logging.info(f"-> [SessionStore] Evicting session {session_id}.")
+            self.delete(session_id)
+
+    def _open(self, path: str, format: str, sample_path: Optional[str]) -> Dataset:
+        # Keyed by path, not digest: a digest that was collected and stored again lives in a new file.
+        with self._datasets_lock:
+            dataset = self._datasets.get(path)
+            if dataset is not None:
+                self._datasets.move_to_end(path)
+                return dataset
+        # Opening reads file footers, so do it outside the lock; a racing thread's handle is as good as ours
+        sample = Dataset(sample_path, 'ipc') if sample_path else None
+        dataset = Dataset(path, format, sample=sample)
+        with self._datasets_lock:
+            dataset = self._datasets.setdefault(path, dataset)
+            self._datasets.move_to_end(path)
+            while len(self._datasets) > self.max_cached_datasets:
+                self._datasets.popitem(last=False)
+        return dataset
+
+    def get(self, session_id: str) -> Optional[Dataset]:
+        """
+        Returns a lazy handle to the session's data, or None. Nothing is read
+        until a command asks for specific columns.
+        """
+        with self._connect() as conn:
+            # Reads count as use, so eviction drops the least recently used sessions first
+            conn.execute("UPDATE sessions SET last_used = ? WHERE session_id = ?", (time.time(), session_id))
+            row = conn.execute(
+                "SELECT d.path, d.format, d.sample_path FROM sessions s JOIN datasets d ON d.digest = s.digest WHERE s.session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._open(*row)
+
+    def _collect(self, digest: str):
+        """Removes a dataset once no session references it any more."""
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM sessions WHERE digest = ?", (digest,)).fetchone():
+                return
+            row = conn.execute("SELECT path, sample_path FROM datasets WHERE digest = ?", (digest,)).fetchone()
+            conn.execute("DELETE FROM datasets WHERE digest = ?", (digest,))
+        if row is not None:
+            with self._datasets_lock:
+                self._datasets.pop(row[0], None)
+        self._remove_files(*(row or ()))
+
+    def delete(self, session_id: str):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT digest FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM results WHERE session_id = ?", (session_id,))
+        if row is not None:
+            self._collect(row[0])
+
+    def create_result(self, session_id: str) -> str:
+        """Reserves an ID for a result that will be saved later (pending until then)."""
+        result_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute("INSERT INTO results (result_id, session_id) VALUES (?, ?)", (result_id, session_id))
+        return result_id
+
+    def save_result(self, result_id: str, payload: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE results SET payload = ? WHERE result_id = ?", (payload, result_id))
+
+    def get_result(self, result_id: str) -> Optional[dict]:
+        """Returns {"session_id", "payload"} for a known result ID (payload is None while pending), or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT session_id, payload FROM results WHERE result_id = ?", (result_id,)).fetchone()
+        if row is None:
+            return None
+        return {"session_id": row[0], "payload": row[1]}
+
+    def get_result_rows(self, result_id: str, offset: int, limit: int):
+        """Returns (rows, total) for one page of a stored table result, sliced inside SQLite."""
+        with self._connect() as conn:
+            total = conn.execute(
+                "SELECT json_array_length(payload, '$.data') FROM results WHERE result_id = ?", (result_id,)
+            ).fetchone()
+            rows = conn.execute(
+                "SELECT j.value FROM results, json_each(results.payload, '$.data') AS j "
+                "WHERE results.result_id = ? ORDER BY j.key LIMIT ? OFFSET ?",
+                (result_id, limit, offset),
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows], (total[0] or 0) if total else 0
@@ -14,6 +14,13 @@ class Result(BaseModel):
     message: str
     plot_data: Optional[Dict[str, Any]] = None
 
+    # Set when the result was estimated from a session sample rather than computed exactly.
+    # Table rows then carry 'ci_low'/'ci_high' columns; single values use confidence_interval.
+    approximate: bool = False
+    confidence_level: Optional[float] = None
+    confidence_interval: Optional[List[float]] = None
+    refine_id: Optional[str] = None  # poll /results/{refine_id} for the exact answer
+
     class Config:
         # Allows creating the model from a dictionary or other attributes
         from_attributes = True
@@ -92,7 +92,7 @@ function App() {
           <h2>Step 1: Provide Data</h2>
           <div className="file-input-wrapper">
             <label htmlFor="csv-upload" className="file-input-label">Choose Your File</label>
-            <input id="csv-upload" type="file" accept=".csv" onChange={handleFileChange} className="file-input-hidden" />
+            <input id="csv-upload" type="file" accept=".csv,.parquet,.pq,.feather,.arrow,.ipc" onChange={handleFileChange} className="file-input-hidden" />
             <button className="button-secondary" onClick={handleLoadSample} disabled={!!isLoading}>
               {isLoading === 'sample' ? 'Loading...' : 'Use Sample Data'}
             </button>
@@ -0,0 +1,92 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.command_pipeline import CommandPipeline
+from app.core.command_registry import command_registry
+from app.core.dataset import Dataset
+
+
+@pytest.fixture(scope='module')
+def data(tmp_path_factory):
+    rng = np.random.default_rng(3)
+    num_rows = 2_000
+    df = pd.DataFrame({
+        'Region': rng.choice(['North', 'South', 'East'], num_rows),
+        'Product Name': rng.choice(['Latte', 'Mocha', 'Espresso'], num_rows),
+        'Year': rng.choice([2020, 2021, 2022], num_rows),
+        'Sales': rng.gamma(2.0, 50.0, num_rows),
+        'Units': rng.integers(0, 20, num_rows),
+    })
+    path = os.path.join(tmp_path_factory.mktemp('pipeline'), 'data.parquet')
+    df.to_parquet(path)
+    return df, Dataset(path, 'parquet')
+
+
+def run_both(data, command_name, parameters):
+    df, dataset = data
+    pipeline = CommandPipeline(llm_parser=None)
+    command_module = command_registry.get_command(command_name)
+    params = command_module.pydantic_model(**parameters)
+    return pipeline.execute(command_module, params, dataset), pipeline.execute(command_module, params, df)
+
+
+FILTERS = [
+    pytest.param({'region': 'North'}, id='string'),
+    pytest.param({'REGION': 'nOrTh', 'product_name': 'latte'}, id='string-case-insensitive'),
+    pytest.param({'year': 2021}, id='integer'),
+    pytest.param({'Year': '2022', 'Region': 'south'}, id='mixed'),
+    pytest.param({'region': 'Nowhere'}, id='no-match'),
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('parameters', [
+    {'agg_func': 'sum', 'target_column': 'sales', 'group_by': ['product name']},
+    {'agg_func': 'count', 'group_by': ['year']},
+    {'agg_func': 'max', 'target_column': 'units'},
+    {'agg_func': 'mean', 'target_column': 'Sales'},
+])
+def test_aggregate_on_dataset_matches_dataframe(data, filters, parameters):
+    lazy, exact = run_both(data, 'aggregate_data', {**parameters, 'filters': filters})
+    # Compared as JSON, where a NaN mean (nothing matched) is null on both sides
+    assert lazy.model_dump_json() == exact.model_dump_json()
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_plot_on_dataset_matches_dataframe(data, filters):
+    lazy, exact = run_both(data, 'plot_data', {
+        'plot_type': 'bar', 'target_column': 'units', 'group_by': ['region'], 'filters': filters,
+    })
+    assert lazy.model_dump() == exact.model_dump()
+
+
+def test_only_string_filters_are_pushed_down(data):
+    _, dataset = data
+    assert dataset._filter_expression({'Year': 2021}) is None
+    assert dataset._filter_expression({'Region': 'north'}) is not None
+    # The scan alone already applies the case-insensitive string filter
+    loaded = dataset.load(columns=['Region', 'Year'], filters={'Region': 'NORTH', 'Year': 2021})
+    assert set(loaded['Region']) == {'North'}
+    assert set(loaded['Year']) == {2020, 2021, 2022}
+
+
+@pytest.mark.parametrize('command_name, parameters', [
+    ('describe_data', {}),
+    ('aggregate_data', {'agg_func': 'max', 'target_column': 'units'}),
+])
+def test_unsupported_approximate_commands_skip_the_sample(data, monkeypatch, command_name, parameters):
+    df, dataset = data
+    sample = Dataset(dataset.path, 'parquet')
+    monkeypatch.setattr(dataset, 'sample', sample)
+    monkeypatch.setattr(sample, 'load', lambda *args, **kwargs: pytest.fail('the sample should not be read'))
+
+    command_module = command_registry.get_command(command_name)
+    params = command_module.pydantic_model(**parameters)
+    result = CommandPipeline(llm_parser=None).execute(command_module, params, dataset, approximate=True)
+    assert result.approximate is False
+    assert result.model_dump_json() == command_module.execute(params, df).model_dump_json()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.dataset import Dataset
+from app.core.sampling import build_stratified_sample, estimate, estimate_grouped
+
+
+def make_frame(num_rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'region': rng.choice(['North', 'South', 'East', 'West'], num_rows, p=[0.4, 0.3, 0.2, 0.1]),
+        'product': rng.choice(['A', 'B', 'C'], num_rows),
+        'sales': rng.gamma(2.0, 50.0, num_rows),
+    })
+    df.loc[rng.random(num_rows) < 0.02, 'sales'] = np.nan
+    return df
+
+
+def sample_of(df: pd.DataFrame, tmp_path, max_rows: int) -> pd.DataFrame:
+    path = os.path.join(tmp_path, 'data.parquet')
+    df.to_parquet(path)
+    return build_stratified_sample(Dataset(path, 'parquet'), max_rows=max_rows).to_pandas()
+
+
+def everything(sample: pd.DataFrame) -> pd.Series:
+    return pd.Series(True, index=sample.index)
+
+
+@pytest.mark.parametrize('agg_func', ['sum', 'mean', 'count'])
+def test_full_sample_is_exact(tmp_path, agg_func):
+    df = make_frame(500)
+    sample = sample_of(df, tmp_path, max_rows=1_000)
+    assert len(sample) == len(df)
+
+    result, ci_low, ci_high = estimate(sample, sample['sales'], everything(sample), agg_func)
+    exact = df['sales'].agg(agg_func)
+    assert result == pytest.approx(exact)
+    assert ci_low == pytest.approx(exact)
+    assert ci_high == pytest.approx(exact)
+
+
+@pytest.mark.parametrize('agg_func', ['sum', 'mean', 'count'])
+def test_full_sample_grouped_is_exact(tmp_path, agg_func):
+    df = make_frame(500)
+    sample = sample_of(df, tmp_path, max_rows=1_000)
+
+    estimates = estimate_grouped(sample, 'sales', ['region'], agg_func, everything(sample)).set_index('region')
+    if agg_func == 'count':
+        exact = df.groupby('region').size()
+    else:
+        exact = df.groupby('region')['sales'].agg(agg_func)
+    for column in ['result', 'ci_low', 'ci_high']:
+        assert estimates[column].to_numpy() == pytest.approx(exact.loc[estimates.index].to_numpy())
+
+
+@pytest.fixture(scope='module')
+def partial_samples(tmp_path_factory):
+    """One 50k-row dataset and 20 independent 5k-row stratified samples of it."""
+    df = make_frame(50_000)
+    path = os.path.join(tmp_path_factory.mktemp('partial'), 'data.parquet')
+    df.to_parquet(path)
+    dataset = Dataset(path, 'parquet')
+    return df, [build_stratified_sample(dataset, max_rows=5_000, seed=seed).to_pandas() for seed in range(20)]
+
+
+@pytest.mark.parametrize('agg_func', ['sum', 'mean', 'count'])
+def test_partial_sample_intervals_cover_exact(partial_samples, agg_func):
+    df, samples = partial_samples
+    exact = df.loc[df['product'] == 'B', 'sales'].agg(agg_func)
+
+    covered = 0
+    for sample in samples:
+        assert len(sample) < len(df)
+        result, ci_low, ci_high = estimate(sample, sample['sales'], sample['product'] == 'B', agg_func)
+        assert ci_low < result < ci_high
+        assert result == pytest.approx(exact, rel=0.05)
+        covered += ci_low <= exact <= ci_high
+    # 95% intervals: expect ~19 of 20 to cover the exact value
+    assert covered >= 16
+
+
+@pytest.mark.parametrize('agg_func', ['sum', 'mean', 'count'])
+def test_partial_sample_grouped_intervals_cover_exact(partial_samples, agg_func):
+    df, samples = partial_samples
+    if agg_func == 'count':
+        exact = df.groupby(['region', 'product']).size()
+    else:
+        exact = df.groupby(['region', 'product'])['sales'].agg(agg_func)
+
+    coverage, results = [], []
+    for sample in samples:
+        estimates = estimate_grouped(sample, 'sales', ['region', 'product'], agg_func, everything(sample))
+        estimates = estimates.set_index(['region', 'product']).loc[exact.index]
+        assert len(estimates) == 12
+        assert (estimates['ci_low'] < estimates['ci_high']).all()
+        coverage.append(((estimates['ci_low'] <= exact) & (exact <= estimates['ci_high'])).mean())
+        results.append(estimates['result'].to_numpy())
+    assert np.mean(coverage) >= 0.88
+    # Small groups are noisy in any one sample, but the estimators should be (nearly) unbiased
+    assert np.mean(results, axis=0) == pytest.approx(exact.to_numpy(), rel=0.05)
+
+
+@pytest.fixture
+def api_client(tmp_path_factory, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.session_store import SessionStore
+    # api.main builds its parser and store at import time; point both somewhere harmless first
+    monkeypatch.setenv('OPENROUTER_API_KEY', os.getenv('OPENROUTER_API_KEY', 'test-key'))
+    monkeypatch.setenv('PANDA_SESSION_DIR', str(tmp_path_factory.mktemp('sessions')))
+    main = importlib.import_module('api.main')
+    monkeypatch.setattr(main, 'session_store', SessionStore(base_dir=str(tmp_path_factory.mktemp('sessions'))))
+    # Commands are sent as the JSON the LLM would return, so no network is needed
+    monkeypatch.setattr(main.pipeline.llm_parser, 'parse_command', json.loads)
+    return TestClient(main.app)
+
+
+def test_refine_returns_exact_result(api_client, tmp_path):
+    df = make_frame(50_000)
+    path = os.path.join(tmp_path, 'big.parquet')
+    df.to_parquet(path)
+    with open(path, 'rb') as upload:
+        session_id = api_client.post('/upload_csv', files={'file': ('big.parquet', upload)}).json()['session_id']
+
+    command = {"command_name": "aggregate_data",
+               "parameters": {"agg_func": "mean", "target_column": "sales", "group_by": ["region"]}}
+    response = api_client.post('/analyze', json={
+        'session_id': session_id, 'command': json.dumps(command), 'approximate': True, 'refine': True,
+    })
+    assert response.status_code == 200
+    approximate = response.json()
+    assert approximate['approximate'] is True
+    assert {'ci_low', 'ci_high'} <= set(approximate['data'][0])
+
+    # TestClient runs background tasks before returning, so the exact result is ready
+    refined = api_client.get(f"/results/{approximate['refine_id']}").json()
+    assert refined['status'] == 'done'
+    assert refined['result']['approximate'] is False
+    exact = df.groupby('region')['sales'].mean()
+    for row in refined['result']['data']:
+        assert row['result'] == pytest.approx(exact[row['region']])
+
+    assert api_client.get('/results/does-not-exist').status_code == 404
+
+
+def test_refine_scalar_on_integer_column(api_client, tmp_path):
+    df = make_frame(50_000)
+    df['units'] = np.arange(len(df)) % 7
+    path = os.path.join(tmp_path, 'units.parquet')
+    df.to_parquet(path)
+    with open(path, 'rb') as upload:
+        session_id = api_client.post('/upload_csv', files={'file': ('units.parquet', upload)}).json()['session_id']
+
+    command = {"command_name": "aggregate_data", "parameters": {"agg_func": "sum", "target_column": "units"}}
+    approximate = api_client.post('/analyze', json={
+        'session_id': session_id, 'command': json.dumps(command), 'approximate': True, 'refine': True,
+    }).json()
+    ci_low, ci_high = approximate['confidence_interval']
+    assert ci_low <= approximate['data'] <= ci_high
+
+    # The exact sum is a numpy int64; it must still be stored rather than left pending
+    refined = api_client.get(f"/results/{approximate['refine_id']}").json()
+    assert refined['status'] == 'done'
+    assert refined['result']['result_type'] == 'value'
+    assert refined['result']['data'] == int(df['units'].sum())
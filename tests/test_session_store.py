@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.session_store import SessionStore
+
+
+def csv_bytes(num_rows: int = 100, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'region': rng.choice(['North', 'South'], num_rows), 'sales': rng.random(num_rows)})
+    return df.to_csv(index=False).encode()
+
+
+def parquet_bytes(num_rows: int = 100) -> bytes:
+    buffer = io.BytesIO()
+    pd.DataFrame({'region': ['North', 'South'] * (num_rows // 2), 'sales': np.arange(num_rows)}).to_parquet(buffer)
+    return buffer.getvalue()
+
+
+def stored_files(store: SessionStore) -> list:
+    return sorted(os.listdir(store.data_dir))
+
+
+def index_rows(store: SessionStore, table: str) -> int:
+    with sqlite3.connect(store.index_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(base_dir=str(tmp_path), max_sessions=3)
+
+
+def test_same_upload_shares_one_dataset(store):
+    first = store.create_session_from_file(io.BytesIO(csv_bytes()), 'a.csv')
+    second = store.create_session_from_file(io.BytesIO(csv_bytes()), 'b.csv')
+    assert first != second
+    assert store.get(first).path == store.get(second).path
+    assert index_rows(store, 'datasets') == 1
+    # One data file plus its sample, no leftover temp files
+    assert len(stored_files(store)) == 2
+    assert not any(name.endswith('.tmp') for name in stored_files(store))
+
+
+def test_deleting_last_session_removes_files(store):
+    first = store.create_session_from_file(io.BytesIO(csv_bytes()), 'a.csv')
+    second = store.create_session_from_file(io.BytesIO(csv_bytes()), 'a.csv')
+
+    store.delete(first)
+    assert store.get(first) is None
+    assert len(stored_files(store)) == 2
+
+    store.delete(second)
+    assert stored_files(store) == []
+    assert index_rows(store, 'datasets') == 0
+
+
+def test_eviction_keeps_recently_used_sessions(store):
+    sessions = [store.create_session_from_file(io.BytesIO(csv_bytes(seed=seed)), f'{seed}.csv') for seed in range(3)]
+    # Touch the oldest session, so the next one in line is the least recently used
+    assert store.get(sessions[0]) is not None
+
+    newest = store.create_session_from_file(io.BytesIO(csv_bytes(seed=3)), '3.csv')
+    assert store.get(sessions[1]) is None
+    for session_id in [sessions[0], sessions[2], newest]:
+        assert store.get(session_id) is not None
+    assert index_rows(store, 'sessions') == 3
+    assert len(stored_files(store)) == 6
+
+
+def test_corrupt_upload_leaves_nothing_behind(store):
+    corrupt = parquet_bytes()[:200]
+    with pytest.raises(ValueError):
+        store.create_session_from_file(io.BytesIO(corrupt), 'broken.parquet')
+    assert stored_files(store) == []
+    assert index_rows(store, 'datasets') == 0
+
+    session_id = store.create_session_from_file(io.BytesIO(parquet_bytes()), 'fixed.parquet')
+    assert store.get(session_id).shape == (100, 2)
+
+
+def test_unversioned_index_is_reset(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'stale.parquet').write_bytes(b'old session data')
+    with sqlite3.connect(tmp_path / 'index.sqlite3') as conn:
+        conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, path TEXT NOT NULL)")
+        conn.execute("INSERT INTO sessions VALUES ('old', 'stale.parquet')")
+
+    store = SessionStore(base_dir=str(tmp_path))
+    assert stored_files(store) == []
+    assert store.get('old') is None
+    with sqlite3.connect(store.index_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SessionStore.SCHEMA_VERSION
+
+    session_id = store.create_session_from_file(io.BytesIO(csv_bytes()), 'a.csv')
+    assert store.get(session_id).num_rows == 100
@@ -9,10 +9,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Import application components
 from app.llm.openrouter_parser import OpenRouterParser
-from app.processing.pandas_processor import PandasProcessor
 from app.core.command_pipeline import CommandPipeline
+from app.core.session_store import SessionStore
 from app.audio.speech_recognition_handler import SpeechRecognitionHandler
 
+PAGE_SIZE = 20
+
 # --- Initialization ---
 load_dotenv()
 api_key = os.getenv("OPENROUTER_API_KEY")
@@ -21,105 +23,168 @@ if not api_key:
     raise ValueError("OPENROUTER_API_KEY not found. Please set it in your .env file.")
 
 llm_parser = OpenRouterParser(api_key=api_key)
-data_processor = PandasProcessor()
 audio_handler = SpeechRecognitionHandler()
-pipeline = CommandPipeline(llm_parser=llm_parser, data_processor=data_processor)
+pipeline = CommandPipeline(llm_parser=llm_parser)
+# Same bounded store as the FastAPI app (see PANDA_SESSION_DIR / PANDA_MAX_SESSIONS).
+# gr.State only ever holds session/result IDs, never the data itself.
+session_store = SessionStore()
 
 # --- SEPARATE UI LOGIC FUNCTIONS ---
 
-def upload_csv(csv_file):
+def render_data_page(session_id, page):
+    """
+    Reads a single page of the session's data from the store.
     """
-    Handles only the CSV upload and stores the DataFrame in Gradio's state.
+    dataset = session_store.get(session_id) if session_id else None
+    if dataset is None:
+        return None, 0, "No data loaded."
+    last_page = max((dataset.num_rows - 1) // PAGE_SIZE, 0)
+    page = min(max(int(page or 0), 0), last_page)
+    return dataset.page(page, PAGE_SIZE), page, f"Page {page + 1} of {last_page + 1}"
+
+def render_result_page(result_id, page):
     """
-    if csv_file is None:
-        return None, "Please upload a valid CSV file."
+    Reads a single page of a stored table result.
+    """
+    if not result_id:
+        return None, 0, ""
+    _, total = session_store.get_result_rows(result_id, 0, 0)
+    last_page = max((total - 1) // PAGE_SIZE, 0)
+    page = min(max(int(page or 0), 0), last_page)
+    rows, _ = session_store.get_result_rows(result_id, page * PAGE_SIZE, PAGE_SIZE)
+    return pd.DataFrame(rows), page, f"Page {page + 1} of {last_page + 1}"
+
+def upload_file(data_file):
+    """
+    Handles only the upload: the file goes into the shared session store and
+    only the resulting session ID is kept in Gradio's state.
+    """
+    if data_file is None:
+        return None, "Please upload a valid data file.", None, 0, ""
+    filename = os.path.basename(data_file.name)
+    if not session_store.is_supported(filename):
+        return None, f"Unsupported file type: `{filename}`.", None, 0, ""
     try:
-        df = pd.read_csv(csv_file.name)
-        message = f"Successfully loaded `{os.path.basename(csv_file.name)}`. Shape: {df.shape}. Ready for commands."
+        with open(data_file.name, 'rb') as stream:
+            session_id = session_store.create_session_from_file(stream, filename)
+        dataset = session_store.get(session_id)
+        message = f"Successfully loaded `{filename}`. Shape: {dataset.shape}. Ready for commands."
         print(f"-> [UI] {message}")
-        return df, message
+        table, page, label = render_data_page(session_id, 0)
+        return session_id, message, table, page, label
     except Exception as e:
-        message = f"Error loading CSV: {e}"
+        message = f"Error loading file: {e}"
         print(f"-> [UI] {message}")
-        return None, message
+        return None, message, None, 0, ""
 
-def process_command(df_state, text_command, audio_command):
+def process_command(session_id, text_command, audio_command, approximate):
     """
-    Handles only the command processing against the stored DataFrame.
+    Handles only the command processing against the stored session.
+    Returns (message, result_id, result table page, page number, page label, value).
     """
-    # 1. Add print statements at the very top to confirm execution
     print("\n-> [UI] 'Process Command' button clicked. Starting command processing...")
     print(f"-> [UI] Received text_command: '{text_command}'")
+    empty = (None, None, 0, "", None)
 
-    # 2. Check if a DataFrame is available from the state
-    if df_state is None:
-        message = "⚠️ Please upload a CSV file first."
+    dataset = session_store.get(session_id) if session_id else None
+    if dataset is None:
+        message = "⚠️ Please upload a data file first."
         print(f"-> [UI] {message}")
-        return message, None, None
+        return (message, *empty)
 
-    # 3. Determine which command to use (text or audio)
+    # Determine which command to use (text or audio)
     command_to_process = ""
     if text_command and text_command.strip():
         command_to_process = text_command.strip()
     elif audio_command:
         transcribed_text = audio_handler.transcribe_audio(audio_command)
         if not transcribed_text:
-            return "Could not understand audio. Please try again or type the command.", None, None
+            return ("Could not understand audio. Please try again or type the command.", *empty)
         command_to_process = transcribed_text
     else:
-        return "⚠️ Please provide a command by typing or speaking.", None, None
-    
-    # 4. Run the main pipeline
+        return ("⚠️ Please provide a command by typing or speaking.", *empty)
+
+    # Run the main pipeline
     print(f"-> [UI] Handing off to pipeline with command: '{command_to_process}'")
-    result = pipeline.run(command_to_process, df_state)
+    try:
+        result = pipeline.run(command_to_process, dataset, approximate=approximate)
+    except Exception as e:
+        return (f"Error: {e}", *empty)
 
-    # 5. Format and return the result for display
+    # Format and return the result for display
     if result.result_type == 'error':
-        return result.message, None, None
+        return (result.message, *empty)
     if result.result_type == 'table':
-        result_df = pd.DataFrame(result.data)
-        return result.message, result_df, None
+        # Park the rows in the store and only render the first page
+        result_id = session_store.create_result(session_id)
+        session_store.save_result(result_id, result.model_dump_json())
+        table, page, label = render_result_page(result_id, 0)
+        return result.message, result_id, table, page, label, None
     if result.result_type == 'value':
-        return result.message, None, str(result.data)
-    
-    return "Completed.", None, None
+        value = str(result.data)
+        if result.confidence_interval:
+            low, high = result.confidence_interval
+            value += f" (95% CI: {low:.4g} to {high:.4g})"
+        return result.message, None, None, 0, "", value
+
+    return ("Completed.", *empty)
 
 # --- REVISED Gradio Interface Definition ---
 with gr.Blocks(theme=gr.themes.Soft(), title="P.A.N.D-A") as app:
     gr.Markdown("# P.A.N.D-A (Pandas Assistant for Natural Data Analysis)")
-    gr.Markdown("Step 1: Upload a CSV. \nStep 2: Ask a question about the data.")
-    
-    # Use gr.State to hold the dataframe in memory for the session
-    df_state = gr.State()
+    gr.Markdown("Step 1: Upload a data file. \nStep 2: Ask a question about the data.")
+
+    # Only lightweight handles live in gr.State; the data stays in the session store
+    session_state = gr.State()
+    result_state = gr.State()
+    data_page = gr.State(0)
+    result_page = gr.State(0)
 
     with gr.Row():
         with gr.Column(scale=1):
             gr.Markdown("### Step 1: Upload Data")
-            file_upload = gr.File(label="Upload CSV", file_types=[".csv"])
-            
+            file_upload = gr.File(label="Upload CSV / Parquet / Feather / Arrow", file_types=[".csv", ".parquet", ".pq", ".feather", ".arrow", ".ipc"])
+
             gr.Markdown("### Step 2: Ask a Question")
             text_input = gr.Textbox(label="Type Command", placeholder="e.g., 'total sales by product'")
             audio_input = gr.Audio(sources=["microphone"], type="filepath", label="Or Record Command")
+            approximate_input = gr.Checkbox(label="Approximate (faster on large files)", value=False)
             submit_btn = gr.Button("Process Command")
-        
+
         with gr.Column(scale=2):
             gr.Markdown("### Results")
             output_message = gr.Textbox(label="Status / Message", interactive=False, lines=2)
             output_table = gr.DataFrame(label="Data Output", interactive=False)
+            with gr.Row():
+                result_prev_btn = gr.Button("◀ Prev")
+                result_page_label = gr.Markdown()
+                result_next_btn = gr.Button("Next ▶")
             output_value = gr.Textbox(label="Value Output", interactive=False)
 
+            gr.Markdown("### Data Preview")
+            data_table = gr.DataFrame(label="Uploaded Data", interactive=False)
+            with gr.Row():
+                data_prev_btn = gr.Button("◀ Prev")
+                data_page_label = gr.Markdown()
+                data_next_btn = gr.Button("Next ▶")
+
     # Wire up the components to the correct functions
     file_upload.upload(
-        fn=upload_csv,
+        fn=upload_file,
         inputs=[file_upload],
-        outputs=[df_state, output_message]
+        outputs=[session_state, output_message, data_table, data_page, data_page_label]
     )
-    
+
     submit_btn.click(
         fn=process_command,
-        inputs=[df_state, text_input, audio_input],
-        outputs=[output_message, output_table, output_value]
+        inputs=[session_state, text_input, audio_input, approximate_input],
+        outputs=[output_message, result_state, output_table, result_page, result_page_label, output_value]
     )
 
+    data_prev_btn.click(fn=lambda s, p: render_data_page(s, p - 1), inputs=[session_state, data_page], outputs=[data_table, data_page, data_page_label])
+    data_next_btn.click(fn=lambda s, p: render_data_page(s, p + 1), inputs=[session_state, data_page], outputs=[data_table, data_page, data_page_label])
+    result_prev_btn.click(fn=lambda r, p: render_result_page(r, p - 1), inputs=[result_state, result_page], outputs=[output_table, result_page, result_page_label])
+    result_next_btn.click(fn=lambda r, p: render_result_page(r, p + 1), inputs=[result_state, result_page], outputs=[output_table, result_page, result_page_label])
+
 if __name__ == "__main__":
     app.launch(share=False)